@@ -2,18 +2,23 @@ from __future__ import annotations
 
 import json
 import pathlib
-from typing import Any, Dict, Optional, Tuple
+import string
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
 import streamlit as st
 
 from arcgis_utils import (
+    arcgis_intersect_query,
     arcgis_query,
     discover_city_layers,
     extract_first_attributes,
-    extract_first_geometry,
-    layer_metadata,
-    pick_best_code_field,
-    coded_value_map,
+    geometry_json,
+    layer_code_field,
+    sql_string_literal,
 )
 
 BASE_DIR = pathlib.Path(__file__).parent
@@ -22,61 +27,163 @@ DATA_DIR = BASE_DIR / "data"
 CORE_CFG_PATH = DATA_DIR / "core_services.json"
 PINELLAS_CITY_APPS_PATH = DATA_DIR / "pinellas_city_apps.json"
 
+_LAYER_TITLE_WEIGHTS = (
+    (("zoning", "zone"), 50),
+    (("future",), 25),
+    (("land use", "landuse", "flum", "flu"), 25),
+    (("overlay",), -10),
+    (("historic",), -5),
+)
+_CITY_APP_URL_KEYS = (
+    "zoning_flu_app",
+    "gis_viewer_app",
+    "zoning_flu_lookup_app",
+    "zoning_lookup_app",
+    "future_land_use_2045_app",
+    "zoning_app",
+)
+_DESCRIPTION_FIELDS = ("ZONEDESC", "ZONE_DESC", "DESCRIPTION", "DESC", "LANDUSE_DESC", "FLU_DESC", "FUTURE_LAND_USE_DESC")
+_PARCEL_ID_SEGMENTS = ((0, 2), (2, 4), (4, 6), (6, 11), (11, 14), (14, 18))
+_PARCEL_ID_MAX_LEN = 30
+_PARCEL_QUERY_BATCH_SIZE = 500
+_PARCEL_ID_CHARS = frozenset(string.ascii_letters + string.digits + "-. ")
+_JURISDICTION_KEY_DROP = str.maketrans("", "", string.punctuation + string.whitespace + string.digits)
+_DISCOVERY_REFRESH_SECONDS = 86400
+_WARM_MAX_WORKERS = 8
+
+
+def _reject_duplicate_keys(pairs: List[Tuple[str, Any]]) -> dict:
+    out: Dict[str, Any] = {}
+    for key, value in pairs:
+        if key in out:
+            raise ValueError(f"Duplicate key in JSON object: {key!r}")
+        out[key] = value
+    return out
+
 
 def load_json(path: pathlib.Path) -> dict:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return json.loads(path.read_text(encoding="utf-8"), object_pairs_hook=_reject_duplicate_keys)
 
 
-@st.cache_data(show_spinner=False)
-def get_core_cfg() -> dict:
-    return load_json(CORE_CFG_PATH)
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
 
 
-@st.cache_data(show_spinner=False)
-def get_pinellas_city_apps() -> dict:
+@st.cache_resource(show_spinner=False)
+def get_core_cfg() -> Mapping[str, Any]:
+    return freeze(load_json(CORE_CFG_PATH))
+
+
+@st.cache_resource(show_spinner=False)
+def get_pinellas_city_apps() -> Mapping[str, Any]:
     if PINELLAS_CITY_APPS_PATH.exists():
-        return load_json(PINELLAS_CITY_APPS_PATH)
-    return {}
+        return freeze(load_json(PINELLAS_CITY_APPS_PATH))
+    return MappingProxyType({})
+
+
+def validate_parcel_id(parcel_id: str) -> Tuple[bool, str]:
+    if not parcel_id:
+        return False, "Enter a parcel ID."
+    if len(parcel_id) > _PARCEL_ID_MAX_LEN:
+        return False, f"Parcel ID must be at most {_PARCEL_ID_MAX_LEN} characters."
+    if not _PARCEL_ID_CHARS.issuperset(parcel_id):
+        return False, "Parcel ID may only contain letters, digits, dashes, dots and spaces."
+    return True, ""
+
+
+def normalize_parcel_id(parcel_id: str) -> str:
+    pid = parcel_id.strip()
+    if len(pid) == 18 and pid.isdigit():
+        return "-".join(pid[a:b] for a, b in _PARCEL_ID_SEGMENTS)
+    return pid
 
 
-def pinellas_get_parcel_geometry(parcel_id: str, cfg: dict) -> Tuple[Optional[dict], Optional[dict], str]:
+@lru_cache(maxsize=256)
+def jurisdiction_key(name: str) -> str:
+    return (name or "").casefold().translate(_JURISDICTION_KEY_DROP)
+
+
+@st.cache_resource(show_spinner=False)
+def get_pinellas_city_index() -> Mapping[str, Mapping[str, Any]]:
+    apps = get_pinellas_city_apps()
+    return MappingProxyType({jurisdiction_key(k): v for k, v in apps.items() if isinstance(v, Mapping)})
+
+
+@st.cache_resource(show_spinner=False)
+def get_pinellas_override_index() -> Mapping[str, Mapping[str, Any]]:
+    overrides = get_core_cfg()["pinellas"].get("known_city_overrides") or {}
+    return MappingProxyType({jurisdiction_key(k): v for k, v in overrides.items()})
+
+
+def city_app_url(app_info: Mapping[str, Any]) -> Optional[str]:
+    return next((app_info[k] for k in _CITY_APP_URL_KEYS if app_info.get(k)), None)
+
+
+@st.cache_data(show_spinner=False)
+def route_jurisdiction(jurisdiction: str) -> Dict[str, Optional[str]]:
+    key = jurisdiction_key(jurisdiction)
+    override = get_pinellas_override_index().get(key)
+    if override:
+        return {"kind": "override", "zoning_layer": override["zoning_layer"], "flu_layer": override["flu_layer"], "app_url": None}
+
+    if jurisdiction.lower().startswith("unincorporated"):
+        uninc = get_core_cfg()["pinellas"]["unincorporated"]
+        return {"kind": "unincorporated", "zoning_layer": uninc["zoning_layer"], "flu_layer": uninc["flu_layer"], "app_url": None}
+
+    app_info = get_pinellas_city_index().get(key) or {}
+    return {"kind": "city_app", "zoning_layer": None, "flu_layer": None, "app_url": city_app_url(app_info)}
+
+
+def pinellas_get_parcel_geometries(parcel_ids: List[str], cfg: Mapping[str, Any]) -> Dict[str, Tuple[dict, dict]]:
     parcels_layer = cfg["parcels_layer"]
     pid_field = cfg["parcel_id_field"]
 
-    safe_pid = parcel_id.replace("'", "''")
-    where = f"{pid_field} = '{safe_pid}'"
+    unique_ids = list(dict.fromkeys(parcel_ids))
+    found: Dict[str, Tuple[dict, dict]] = {}
 
-    fs = arcgis_query(
-        parcels_layer,
-        where=where,
-        out_fields="*",
-        return_geometry=True,
-        out_sr=4326,
-        result_record_count=1,
-    )
+    for start in range(0, len(unique_ids), _PARCEL_QUERY_BATCH_SIZE):
+        batch = unique_ids[start:start + _PARCEL_QUERY_BATCH_SIZE]
+        quoted = ", ".join(sql_string_literal(pid) for pid in batch)
 
-    attrs = extract_first_attributes(fs)
-    geom = extract_first_geometry(fs)
+        fs = arcgis_query(
+            parcels_layer,
+            where=f"{pid_field} IN ({quoted})",
+            out_fields=pid_field,
+            return_geometry=True,
+            out_sr=4326,
+            result_record_count=len(batch),
+            geometry_precision=6,
+        )
+
+        for feat in fs.get("features") or []:
+            attrs = feat.get("attributes") or {}
+            geom = feat.get("geometry")
+            pid = attrs.get(pid_field)
+            if geom and pid is not None:
+                found.setdefault(str(pid), (geom, attrs))
+
+        if fs.get("exceededTransferLimit") and len(batch) > 1 and not found.keys() >= set(batch):
+            raise ValueError(f"Parcel layer truncated a {len(batch)}-ID query (exceededTransferLimit).")
+    return found
+
+
+def pinellas_get_parcel_geometry(parcel_id: str, cfg: Mapping[str, Any]) -> Tuple[Optional[dict], Optional[dict], str]:
+    found = pinellas_get_parcel_geometries([parcel_id], cfg)
+    geom, attrs = found.get(parcel_id) or next(iter(found.values()), (None, None))
     if not geom:
         return None, None, "Parcel geometry not found in county parcel layer."
     return geom, attrs, ""
 
 
-def pinellas_get_jurisdiction(parcel_geom: dict, cfg: dict) -> Tuple[str, Optional[dict]]:
+def pinellas_get_jurisdiction(parcel_geom: Union[dict, str], cfg: Mapping[str, Any]) -> Tuple[str, Optional[dict]]:
     muni_layer = cfg["municipal_boundary_layer"]
     name_field = cfg["municipal_name_field"]
 
-    fs = arcgis_query(
-        muni_layer,
-        where="1=1",
-        out_fields="*",
-        return_geometry=False,
-        geometry=parcel_geom,
-        geometry_type="esriGeometryPolygon",
-        in_sr=4326,
-        out_sr=4326,
-        result_record_count=5,
-    )
+    fs = arcgis_intersect_query(muni_layer, parcel_geom, out_fields=name_field, result_record_count=1)
     attrs = extract_first_attributes(fs) or {}
     name = (attrs.get(name_field) or "").strip()
     if name:
@@ -84,42 +191,33 @@ def pinellas_get_jurisdiction(parcel_geom: dict, cfg: dict) -> Tuple[str, Option
     return "Unincorporated Pinellas County", None
 
 
-def query_zoning_or_flu(layer_url: str, parcel_geom: dict, kind: str) -> Dict[str, Any]:
-    out = {"ok": False, "code": "", "description": "", "layer_url": layer_url, "kind": kind, "raw": None, "error": ""}
+def query_zoning_or_flu(layer_url: str, parcel_geom: Union[dict, str], kind: str) -> Dict[str, Any]:
+    out = {"ok": False, "code": "", "description": "", "layer_url": layer_url, "kind": kind, "raw": None, "error": "", "retryable": False}
 
     if not layer_url:
         out["error"] = "Missing layer URL."
         return out
 
-    try:
-        meta = layer_metadata(layer_url)
-    except Exception as e:
-        out["error"] = f"Layer metadata fetch failed: {e}"
-        return out
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        query_future = pool.submit(arcgis_intersect_query, layer_url, parcel_geom)
 
-    field_def = pick_best_code_field(meta, kind=kind)
-    if not field_def:
-        out["error"] = "Could not identify a likely code field from layer metadata."
-        return out
+        try:
+            code_field_info = layer_code_field(layer_url, kind)
+        except Exception as e:
+            out.update({"error": f"Layer metadata fetch failed: {e}", "retryable": True})
+            return out
 
-    code_field = field_def["name"]
-    domain_map = coded_value_map(field_def)
+        if not code_field_info:
+            out["error"] = "Could not identify a likely code field from layer metadata."
+            return out
 
-    try:
-        fs = arcgis_query(
-            layer_url,
-            where="1=1",
-            out_fields="*",
-            return_geometry=False,
-            geometry=parcel_geom,
-            geometry_type="esriGeometryPolygon",
-            in_sr=4326,
-            out_sr=4326,
-            result_record_count=5,
-        )
-    except Exception as e:
-        out["error"] = f"Layer query failed: {e}"
-        return out
+        code_field, domain_map = code_field_info
+
+        try:
+            fs = query_future.result()
+        except Exception as e:
+            out.update({"error": f"Layer query failed: {e}", "retryable": True})
+            return out
 
     attrs = extract_first_attributes(fs)
     if not attrs:
@@ -127,14 +225,7 @@ def query_zoning_or_flu(layer_url: str, parcel_geom: dict, kind: str) -> Dict[st
         return out
 
     code = attrs.get(code_field)
-    desc = ""
-    if domain_map and code in domain_map:
-        desc = domain_map.get(code, "")
-    else:
-        for k in ("ZONEDESC", "ZONE_DESC", "DESCRIPTION", "DESC", "LANDUSE_DESC", "FLU_DESC", "FUTURE_LAND_USE_DESC"):
-            if k in attrs and attrs.get(k):
-                desc = str(attrs.get(k))
-                break
+    desc = domain_map.get(code) or next((str(attrs[k]) for k in _DESCRIPTION_FIELDS if attrs.get(k)), "")
 
     out.update({
         "ok": True,
@@ -146,8 +237,47 @@ def query_zoning_or_flu(layer_url: str, parcel_geom: dict, kind: str) -> Dict[st
     return out
 
 
-@st.cache_data(show_spinner=False)
-def cached_discover_city_layers(app_url: str) -> dict:
+def _warm_layer_code_field(layer_url: str, kind: str) -> None:
+    try:
+        layer_code_field(layer_url, kind)
+    except Exception:
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def warm_known_layer_fields() -> List[Future]:
+    cfg = get_core_cfg().get("pinellas") or {}
+    sources = [cfg.get("unincorporated"), *(cfg.get("known_city_overrides") or {}).values()]
+    layers: List[Tuple[str, str]] = []
+    for src in sources:
+        if not isinstance(src, Mapping):
+            continue
+        for key, kind in (("zoning_layer", "zoning"), ("flu_layer", "flu")):
+            if src.get(key):
+                layers.append((src[key], kind))
+    layers = list(dict.fromkeys(layers))
+    if not layers:
+        return []
+
+    pool = ThreadPoolExecutor(max_workers=min(len(layers), _WARM_MAX_WORKERS))
+    futures = [pool.submit(_warm_layer_code_field, layer_url, kind) for layer_url, kind in layers]
+    pool.shutdown(wait=False)
+    return futures
+
+
+def query_zoning_and_flu(z_layer: Optional[str], f_layer: Optional[str], parcel_geom: Union[dict, str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        z_future = pool.submit(query_zoning_or_flu, z_layer, parcel_geom, "zoning")
+        f = query_zoning_or_flu(f_layer, parcel_geom, "flu")
+        return z_future.result(), f
+
+
+def discovery_epoch() -> int:
+    return int(time.time() // _DISCOVERY_REFRESH_SECONDS)
+
+
+@st.cache_data(show_spinner=False, persist="disk")
+def cached_discover_city_layers(app_url: str, epoch: int) -> dict:
     return discover_city_layers(app_url)
 
 
@@ -157,115 +287,132 @@ def pick_best_layer_from_candidates(candidates: list) -> Optional[str]:
 
     def score(title: str) -> int:
         t = (title or "").lower()
-        s = 0
-        if "zoning" in t or "zone" in t:
-            s += 50
-        if "future" in t:
-            s += 25
-        if "land use" in t or "landuse" in t or "flum" in t or "flu" in t:
-            s += 25
-        if "overlay" in t:
-            s -= 10
-        if "historic" in t:
-            s -= 5
-        return s
+        return sum(weight for words, weight in _LAYER_TITLE_WEIGHTS if any(w in t for w in words))
 
     best = max(candidates, key=lambda c: score(c.get("title", "")))
     return best.get("url")
 
 
-def pinellas_lookup(parcel_id: str) -> Dict[str, Any]:
+class RetryableLookupResult(Exception):
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error", ""))
+        self.result = result
+
+
+def is_retryable_result(result: Mapping[str, Any]) -> bool:
+    if result.get("status") == "service_unavailable":
+        return True
+    return any((result.get(k) or {}).get("retryable") for k in ("zoning", "future_land_use"))
+
+
+def run_pinellas_lookup(parcel_id: str) -> Dict[str, Any]:
     cfg = get_core_cfg()["pinellas"]
-    city_apps = get_pinellas_city_apps()
 
-    geom, parcel_attrs, err = pinellas_get_parcel_geometry(parcel_id, cfg)
+    try:
+        geom, parcel_attrs, err = pinellas_get_parcel_geometry(parcel_id, cfg)
+    except Exception as e:
+        return {"status": "service_unavailable", "county": "Pinellas", "parcel_id": parcel_id, "error": f"Parcel query failed: {e}"}
     if err:
         return {"status": "not_found", "error": err}
 
-    jurisdiction, muni_attrs = pinellas_get_jurisdiction(geom, cfg)
+    geom_json = geometry_json(geom)
 
-    overrides = cfg.get("known_city_overrides") or {}
-    if jurisdiction in overrides:
-        z_layer = overrides[jurisdiction]["zoning_layer"]
-        f_layer = overrides[jurisdiction]["flu_layer"]
-        z = query_zoning_or_flu(z_layer, geom, "zoning")
-        f = query_zoning_or_flu(f_layer, geom, "flu")
-        return {"status": "ok", "county": "Pinellas", "parcel_id": parcel_id, "jurisdiction": jurisdiction, "zoning": z, "future_land_use": f}
+    try:
+        jurisdiction, muni_attrs = pinellas_get_jurisdiction(geom_json, cfg)
+    except Exception as e:
+        return {"status": "service_unavailable", "county": "Pinellas", "parcel_id": parcel_id, "error": f"Jurisdiction query failed: {e}"}
 
-    if jurisdiction.lower().startswith("unincorporated"):
-        z_layer = cfg["unincorporated"]["zoning_layer"]
-        f_layer = cfg["unincorporated"]["flu_layer"]
-        z = query_zoning_or_flu(z_layer, geom, "zoning")
-        f = query_zoning_or_flu(f_layer, geom, "flu")
+    route = route_jurisdiction(jurisdiction)
+    if route["kind"] != "city_app":
+        z, f = query_zoning_and_flu(route["zoning_layer"], route["flu_layer"], geom_json)
         return {"status": "ok", "county": "Pinellas", "parcel_id": parcel_id, "jurisdiction": jurisdiction, "zoning": z, "future_land_use": f}
 
-    app_info = city_apps.get(jurisdiction) or {}
-    app_url = (
-        app_info.get("zoning_flu_app")
-        or app_info.get("gis_viewer_app")
-        or app_info.get("zoning_flu_lookup_app")
-        or app_info.get("zoning_lookup_app")
-        or app_info.get("future_land_use_2045_app")
-        or app_info.get("zoning_app")
-    )
-
+    app_url = route["app_url"]
     if not app_url:
         return {"status": "not_found", "county": "Pinellas", "parcel_id": parcel_id, "jurisdiction": jurisdiction, "error": "No app URL configured for this jurisdiction."}
 
-    discovery = cached_discover_city_layers(app_url)
+    try:
+        discovery = cached_discover_city_layers(app_url, discovery_epoch())
+    except Exception as e:
+        return {"status": "service_unavailable", "county": "Pinellas", "parcel_id": parcel_id, "jurisdiction": jurisdiction, "error": f"Discovery failed: {e}"}
     if not discovery.get("ok"):
         return {"status": "service_unavailable", "county": "Pinellas", "parcel_id": parcel_id, "jurisdiction": jurisdiction, "error": discovery.get("error", "Discovery failed."), "discovery": discovery}
 
     z_best = pick_best_layer_from_candidates(discovery["candidates"]["zoning"])
     f_best = pick_best_layer_from_candidates(discovery["candidates"]["flu"])
 
-    z = query_zoning_or_flu(z_best, geom, "zoning") if z_best else {"ok": False, "error": "No zoning candidate layers found.", "candidates": discovery["candidates"]["zoning"]}
-    f = query_zoning_or_flu(f_best, geom, "flu") if f_best else {"ok": False, "error": "No FLU candidate layers found.", "candidates": discovery["candidates"]["flu"]}
+    z, f = query_zoning_and_flu(z_best, f_best, geom_json)
+    if not z_best:
+        z = {"ok": False, "error": "No zoning candidate layers found.", "candidates": discovery["candidates"]["zoning"]}
+    if not f_best:
+        f = {"ok": False, "error": "No FLU candidate layers found.", "candidates": discovery["candidates"]["flu"]}
 
     return {"status": "ok", "county": "Pinellas", "parcel_id": parcel_id, "jurisdiction": jurisdiction, "zoning": z, "future_land_use": f, "discovery": discovery}
 
 
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def cached_pinellas_lookup(parcel_id: str) -> Dict[str, Any]:
+    result = run_pinellas_lookup(parcel_id)
+    retryable = is_retryable_result(result)
+    for key in ("zoning", "future_land_use"):
+        (result.get(key) or {}).pop("retryable", None)
+    if retryable:
+        raise RetryableLookupResult(result)
+    return result
+
+
+def pinellas_lookup(parcel_id: str) -> Dict[str, Any]:
+    try:
+        return cached_pinellas_lookup(parcel_id)
+    except RetryableLookupResult as e:
+        return e.result
+
+
+@st.fragment
+def render_city_discovery_debug() -> None:
+    city_apps = get_pinellas_city_apps()
+    city_names = sorted([k for k,v in city_apps.items() if isinstance(v, Mapping)])
+    if not city_names:
+        st.info("No cities found in data/pinellas_city_apps.json")
+        return
+
+    city_name = st.selectbox("Pinellas City", options=city_names)
+    app_url = city_app_url(city_apps.get(city_name, {}))
+    st.write("App URL:", app_url or "(none)")
+    if st.button("Discover Layers for Selected City", use_container_width=True) and app_url:
+        with st.spinner("Discovering operational layers from webmap..."):
+            try:
+                st.json(cached_discover_city_layers(app_url, discovery_epoch()), expanded=False)
+            except Exception as e:
+                st.error(f"Discovery failed: {e}")
+
+
 st.set_page_config(page_title="Parcel Zoning/FLU Lookup Test", layout="wide")
 st.title("Parcel Zoning + Future Land Use (Test App)")
+warm_known_layer_fields()
 
 left, right = st.columns([1, 1])
 with left:
     st.subheader("Inputs")
-    county = st.selectbox("County", options=["Pinellas", "Hillsborough", "Pasco"], index=0)
-    parcel_id = st.text_input("Parcel ID", placeholder="03-31-15-25128-001-0010")
-    run_lookup = st.button("Lookup", type="primary", use_container_width=True)
+    with st.form("lookup_form", border=False):
+        county = st.selectbox("County", options=["Pinellas", "Hillsborough", "Pasco"], index=0)
+        parcel_id = st.text_input("Parcel ID", placeholder="03-31-15-25128-001-0010")
+        run_lookup = st.form_submit_button("Lookup", type="primary", use_container_width=True)
     st.caption("Pinellas is implemented. Hillsborough/Pasco are stubs in data/core_services.json.")
 
 with right:
     st.subheader("Result")
     if run_lookup:
-        if not parcel_id.strip():
-            st.error("Enter a parcel ID.")
+        pid_ok, pid_error = validate_parcel_id(parcel_id.strip())
+        if not pid_ok:
+            st.error(pid_error)
         elif county != "Pinellas":
             st.warning("Only Pinellas is wired in this test app. Add endpoints to data/core_services.json to extend.")
         else:
             with st.spinner("Querying parcel geometry + zoning/FLU..."):
-                result = pinellas_lookup(parcel_id.strip())
+                result = pinellas_lookup(normalize_parcel_id(parcel_id))
             st.json(result, expanded=True)
 
 st.divider()
 st.subheader("Debug: City App Discovery (optional)")
-city_apps = get_pinellas_city_apps()
-city_names = sorted([k for k,v in city_apps.items() if isinstance(v, dict)])
-if city_names:
-    city_name = st.selectbox("Pinellas City", options=city_names)
-    app_info = city_apps.get(city_name, {})
-    app_url = (
-        app_info.get("zoning_flu_app")
-        or app_info.get("gis_viewer_app")
-        or app_info.get("zoning_flu_lookup_app")
-        or app_info.get("zoning_lookup_app")
-        or app_info.get("future_land_use_2045_app")
-        or app_info.get("zoning_app")
-    )
-    st.write("App URL:", app_url or "(none)")
-    if st.button("Discover Layers for Selected City", use_container_width=True) and app_url:
-        with st.spinner("Discovering operational layers from webmap..."):
-            st.json(cached_discover_city_layers(app_url), expanded=False)
-else:
-    st.info("No cities found in data/pinellas_city_apps.json")
+render_city_discovery_debug()
@@ -2,23 +2,169 @@ from __future__ import annotations
 
 import json
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+MAX_RETRY_WAIT_SECONDS = 10.0
+
+
+class CappedRetry(Retry):
+    def get_backoff_time(self) -> float:
+        return min(super().get_backoff_time(), MAX_RETRY_WAIT_SECONDS)
+
+    def get_retry_after(self, response: Any) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_WAIT_SECONDS)
 
 
 def resilient_session() -> requests.Session:
     s = requests.Session()
-    s.headers.update({"User-Agent": "parcel-lookup-test-app/1.0"})
+    retry = CappedRetry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=20, pool_maxsize=20, pool_block=True)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({
+        "User-Agent": "parcel-lookup-test-app/1.0",
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+    })
     return s
 
 
-def get_json(url: str, params: Optional[dict] = None, timeout: int = 20) -> dict:
-    s = resilient_session()
-    r = s.get(url, params=params, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+_SESSION = resilient_session()
+
+
+def shared_session() -> requests.Session:
+    return _SESSION
+
+
+MAX_RESPONSE_BYTES = 32 * 1024 * 1024
+
+CONDITIONAL_CACHE_MAX_ENTRIES = 256
+
+_CONDITIONAL_CACHE: OrderedDict[str, Tuple[str, str, bytes]] = OrderedDict()
+_CONDITIONAL_CACHE_LOCK = threading.Lock()
+
+
+def _conditional_cache_get(key: str) -> Optional[Tuple[str, str, bytes]]:
+    with _CONDITIONAL_CACHE_LOCK:
+        entry = _CONDITIONAL_CACHE.get(key)
+        if entry is not None:
+            _CONDITIONAL_CACHE.move_to_end(key)
+        return entry
+
+
+def _conditional_cache_put(key: str, entry: Tuple[str, str, bytes]) -> None:
+    with _CONDITIONAL_CACHE_LOCK:
+        _CONDITIONAL_CACHE[key] = entry
+        _CONDITIONAL_CACHE.move_to_end(key)
+        while len(_CONDITIONAL_CACHE) > CONDITIONAL_CACHE_MAX_ENTRIES:
+            _CONDITIONAL_CACHE.popitem(last=False)
+
+
+def _read_bounded(r: requests.Response, max_bytes: int) -> bytearray:
+    body = bytearray()
+    for chunk in r.iter_content(chunk_size=65536):
+        body += chunk
+        if len(body) > max_bytes:
+            raise ValueError(f"Response from {r.url} exceeded {max_bytes} bytes")
+    return body
+
+
+class ArcGISError(Exception):
+    def __init__(self, code: Optional[int], message: str):
+        super().__init__(f"ArcGIS error {code}: {message}" if code is not None else f"ArcGIS error: {message}")
+        self.code = code
+
+
+def _decode_json(body: Union[bytes, bytearray]) -> dict:
+    data = orjson.loads(body) if orjson is not None else json.loads(body)
+    error = data.get("error") if isinstance(data, dict) else None
+    if error:
+        if not isinstance(error, dict):
+            raise ArcGISError(None, str(error))
+        code = error.get("code")
+        raise ArcGISError(code if isinstance(code, int) else None, str(error.get("message") or ""))
+    return data
+
+
+def get_json(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: int = 20,
+    conditional: bool = False,
+    max_bytes: int = MAX_RESPONSE_BYTES,
+) -> dict:
+    s = shared_session()
+    headers: Dict[str, str] = {}
+    cache_key = ""
+    cached = None
+    if conditional:
+        cache_key = url + "?" + urlencode(sorted((params or {}).items()))
+        cached = _conditional_cache_get(cache_key)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+    with s.get(url, params=params, timeout=timeout, headers=headers, stream=True) as r:
+        if cached and r.status_code == 304:
+            return _decode_json(cached[2])
+        r.raise_for_status()
+        body = _read_bounded(r, max_bytes)
+        response_headers = r.headers
+
+    data = _decode_json(body)
+
+    if conditional:
+        etag = response_headers.get("ETag", "")
+        last_modified = response_headers.get("Last-Modified", "")
+        if etag or last_modified:
+            _conditional_cache_put(cache_key, (etag, last_modified, bytes(body)))
+    return data
+
+
+def post_json(url: str, data: dict, timeout: int = 20, max_bytes: int = MAX_RESPONSE_BYTES) -> dict:
+    s = shared_session()
+    with s.post(url, data=data, timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        body = _read_bounded(r, max_bytes)
+    return _decode_json(body)
+
+
+def sql_string_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def geometry_json(geometry: dict) -> str:
+    return json.dumps(geometry, separators=(",", ":"))
 
 
 def arcgis_query(
@@ -27,12 +173,13 @@ def arcgis_query(
     where: str = "1=1",
     out_fields: str = "*",
     return_geometry: bool = False,
-    geometry: Optional[dict] = None,
+    geometry: Optional[Union[dict, str]] = None,
     geometry_type: Optional[str] = None,
     in_sr: Optional[int] = 4326,
     out_sr: Optional[int] = 4326,
     spatial_rel: str = "esriSpatialRelIntersects",
     result_record_count: int = 5,
+    geometry_precision: Optional[int] = None,
     timeout: int = 20
 ) -> dict:
     url = layer_url.rstrip("/") + "/query"
@@ -44,20 +191,44 @@ def arcgis_query(
         "outSR": out_sr,
         "resultRecordCount": result_record_count,
     }
+    if geometry_precision is not None:
+        params["geometryPrecision"] = geometry_precision
 
     if geometry is not None:
         params.update({
-            "geometry": json.dumps(geometry),
+            "geometry": geometry if isinstance(geometry, str) else geometry_json(geometry),
             "geometryType": geometry_type or "esriGeometryPolygon",
             "inSR": in_sr,
             "spatialRel": spatial_rel
         })
 
-    return get_json(url, params=params, timeout=timeout)
+    return post_json(url, data=params, timeout=timeout)
+
+
+def arcgis_intersect_query(
+    layer_url: str,
+    geometry: Union[dict, str],
+    *,
+    out_fields: str = "*",
+    result_record_count: int = 5,
+    timeout: int = 20
+) -> dict:
+    return arcgis_query(
+        layer_url,
+        where="1=1",
+        out_fields=out_fields,
+        return_geometry=False,
+        geometry=geometry,
+        geometry_type="esriGeometryPolygon",
+        in_sr=4326,
+        out_sr=4326,
+        result_record_count=result_record_count,
+        timeout=timeout,
+    )
 
 
 def layer_metadata(layer_url: str) -> dict:
-    return get_json(layer_url.rstrip("/") + "?f=json")
+    return get_json(layer_url.rstrip("/") + "?f=json", conditional=True)
 
 
 def extract_first_geometry(feature_set: dict) -> Optional[dict]:
@@ -74,8 +245,12 @@ def extract_first_attributes(feature_set: dict) -> Optional[dict]:
     return feats[0].get("attributes") or {}
 
 
-_ZONE_NAME_RE = re.compile(r"(zone|zoning)", re.IGNORECASE)
-_FLU_NAME_RE = re.compile(r"(future|land\s*use|flum|flu)", re.IGNORECASE)
+_LAYER_KIND_RE = re.compile(r"(?P<zoning>zone|zoning)|(?P<flu>future|land\s*use|flum|flu)", re.IGNORECASE)
+_APP_ITEM_ID_RE = re.compile(r"[?&]id=([0-9a-f]{32})", re.IGNORECASE)
+_URL_HOST_RE = re.compile(r"https?://([^/]+)/", re.IGNORECASE)
+
+
+_MAX_FIELD_SCORE = 150
 
 
 def _score_field(name: str, alias: str, kind: str) -> int:
@@ -111,6 +286,8 @@ def pick_best_code_field(meta: dict, kind: str) -> Optional[dict]:
         if score > best_score:
             best_score = score
             best = f
+            if best_score >= _MAX_FIELD_SCORE:
+                break
 
     if best_score <= 0:
         return None
@@ -121,10 +298,39 @@ def coded_value_map(field_def: dict) -> Dict[Any, str]:
     domain = field_def.get("domain") or {}
     if domain.get("type") != "codedValue":
         return {}
-    out: Dict[Any, str] = {}
-    for cv in domain.get("codedValues") or []:
-        out[cv.get("code")] = cv.get("name")
-    return out
+    return {cv.get("code"): cv.get("name") for cv in domain.get("codedValues") or ()}
+
+
+CODE_FIELD_TTL_SECONDS = 86400
+
+CODE_FIELD_CACHE_MAX_ENTRIES = 128
+
+_CODE_FIELD_CACHE: OrderedDict[Tuple[str, str], Tuple[float, Optional[Tuple[str, Mapping[Any, str]]]]] = OrderedDict()
+_CODE_FIELD_CACHE_LOCK = threading.Lock()
+
+
+def layer_code_field(layer_url: str, kind: str) -> Optional[Tuple[str, Mapping[Any, str]]]:
+    key = (layer_url, kind)
+    now = time.monotonic()
+    with _CODE_FIELD_CACHE_LOCK:
+        cached = _CODE_FIELD_CACHE.get(key)
+        if cached and now < cached[0]:
+            _CODE_FIELD_CACHE.move_to_end(key)
+            return cached[1]
+
+    meta = layer_metadata(layer_url)
+    if not isinstance(meta.get("fields"), list):
+        raise ValueError(f"Layer metadata for {layer_url} has no fields list")
+    field_def = pick_best_code_field(meta, kind=kind)
+    result = (field_def["name"], MappingProxyType(coded_value_map(field_def))) if field_def else None
+    with _CODE_FIELD_CACHE_LOCK:
+        for stale in [k for k, (expires_at, _) in _CODE_FIELD_CACHE.items() if expires_at <= now]:
+            del _CODE_FIELD_CACHE[stale]
+        _CODE_FIELD_CACHE[key] = (now + CODE_FIELD_TTL_SECONDS, result)
+        _CODE_FIELD_CACHE.move_to_end(key)
+        while len(_CODE_FIELD_CACHE) > CODE_FIELD_CACHE_MAX_ENTRIES:
+            _CODE_FIELD_CACHE.popitem(last=False)
+    return result
 
 
 @dataclass
@@ -134,29 +340,42 @@ class DiscoveredLayer:
 
 
 def parse_webappviewer_id(app_url: str) -> Optional[str]:
-    m = re.search(r"[?&]id=([0-9a-f]{32})", app_url, flags=re.IGNORECASE)
+    m = _APP_ITEM_ID_RE.search(app_url)
     return m.group(1) if m else None
 
 
 def arcgis_host_from_url(app_url: str) -> str:
-    m = re.match(r"https?://([^/]+)/", app_url.strip(), flags=re.IGNORECASE)
+    m = _URL_HOST_RE.match(app_url.strip())
     if not m:
         raise ValueError("Could not parse host from URL")
     return m.group(1)
 
 
+def is_transient_error(exc: BaseException) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    if isinstance(exc, ArcGISError) and exc.code is not None:
+        return exc.code in (429, 498, 499) or exc.code >= 500
+    return False
+
+
+def _get_json_or_none(url: str) -> Optional[dict]:
+    try:
+        return get_json(url, params={"f": "json"}, conditional=True)
+    except Exception as e:
+        if is_transient_error(e):
+            raise
+        return None
+
+
 def try_item_json(host: str, item_id: str) -> Tuple[Optional[dict], Optional[dict]]:
     base = f"https://{host}/sharing/rest/content/items/{item_id}"
-    meta = None
-    data = None
-    try:
-        meta = get_json(base, params={"f": "json"})
-    except Exception:
-        meta = None
-    try:
-        data = get_json(base + "/data", params={"f": "json"})
-    except Exception:
-        data = None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        data_future = pool.submit(_get_json_or_none, base + "/data")
+        meta = _get_json_or_none(base)
+        data = data_future.result()
     return meta, data
 
 
@@ -181,7 +400,7 @@ def extract_webmap_id(item_meta: Optional[dict], item_data: Optional[dict]) -> O
 
 def extract_operational_layers_from_webmap(host: str, webmap_id: str) -> List[DiscoveredLayer]:
     wm_base = f"https://{host}/sharing/rest/content/items/{webmap_id}"
-    wm_data = get_json(wm_base + "/data", params={"f": "json"})
+    wm_data = get_json(wm_base + "/data", params={"f": "json"}, conditional=True)
     layers = []
     for lyr in wm_data.get("operationalLayers") or []:
         url = lyr.get("url")
@@ -195,10 +414,14 @@ def pick_candidate_layers(layers: List[DiscoveredLayer]) -> Dict[str, List[Disco
     zoning = []
     flu = []
     for l in layers:
-        t = l.title or ""
-        if _ZONE_NAME_RE.search(t):
+        kinds = set()
+        for m in _LAYER_KIND_RE.finditer(l.title or ""):
+            kinds.add(m.lastgroup)
+            if len(kinds) == 2:
+                break
+        if "zoning" in kinds:
             zoning.append(l)
-        if _FLU_NAME_RE.search(t):
+        if "flu" in kinds:
             flu.append(l)
     return {"zoning": zoning, "flu": flu}
 